@@ -7,25 +7,33 @@ from utils import (
     has_sufficient_liquidity,
     get_token_metadata,
     buy_token,
-    get_token_price,
     sell_token,
     send_telegram_message,
-    listen_to_dbotx_trades
+    listen_to_dbotx_trades,
+    get_session,
+    close_session
 )
-import aiohttp
+import loop_monitor
+import price_feed
+import price_history
+import startup
 import os
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 POSITIONS_FILE = "positions.json"
+HISTORY_FILE = "price_history.bin"
+HISTORY_SAVE_INTERVAL = 30  # seconds
 MAX_TOKEN_AGE = 360  # seconds
 MIN_LIQUIDITY_SOL = 20
 BUY_AMOUNT_SOL = 5
 PROFIT_TARGET = 2.0  # 2x
 STOP_LOSS = 0.5      # 50%
+MONITOR_INTERVAL = 15  # seconds between full position checks
 
 positions = {}
+price_histories = {}
 
 
 def load_positions():
@@ -49,13 +57,23 @@ def save_positions():
 
 
 async def monitor_positions():
+    last_history_save = 0.0
+    last_full_check = 0.0
+    changed = set()
     while True:
+        # Every MONITOR_INTERVAL check all positions (Jupiter-priced ones included),
+        # in between only the mints whose on-chain reserves just moved
+        if time.time() - last_full_check >= MONITOR_INTERVAL:
+            mints = list(positions.keys())
+            last_full_check = time.time()
+        else:
+            mints = [mint for mint in changed if mint in positions]
         try:
-            for mint in list(positions.keys()):
+            for mint in mints:
                 entry = positions[mint]
                 bought_price = entry["buy_price"]
                 symbol = entry.get("symbol", "?")
-                price = await get_token_price(mint)
+                price = await price_feed.get_price(mint)
 
                 if price == 0:
                     logger.warning(f"[price] {mint} returned price 0, skipping")
@@ -66,6 +84,8 @@ async def monitor_positions():
                     await sell_token(mint)
                     await send_telegram_message(f"✅ Sold {symbol} ({mint[:5]}...) for profit!")
                     del positions[mint]
+                    price_histories.pop(mint, None)
+                    await price_feed.unwatch(mint)
                     save_positions()
 
                 elif price <= bought_price * STOP_LOSS:
@@ -73,56 +93,67 @@ async def monitor_positions():
                     await sell_token(mint)
                     await send_telegram_message(f"🛑 Sold {symbol} ({mint[:5]}...) due to stop-loss.")
                     del positions[mint]
+                    price_histories.pop(mint, None)
+                    await price_feed.unwatch(mint)
                     save_positions()
 
+                else:
+                    price_history.record(price_histories, mint, time.time(), price)
+
         except Exception as e:
             logger.warning(f"[monitor error] {e}")
-        await asyncio.sleep(15)
+        if time.time() - last_history_save >= HISTORY_SAVE_INTERVAL:
+            await price_history.save_histories(price_histories, HISTORY_FILE)
+            last_history_save = time.time()
+        changed = await price_feed.wait_for_update(
+            max(0.0, last_full_check + MONITOR_INTERVAL - time.time())
+        )
 
 
 async def process_tokens():
-    async with aiohttp.ClientSession() as session:
-        tokens = await get_recent_tokens_from_dbotx(session)
-        logger.info(f"[main] Fetched {len(tokens)} tokens")
-
-        for token in tokens:
-            mint = token.get("mint")
-            timestamp = token.get("timestamp")
-
-            if not mint or not timestamp:
-                continue
-
-            if mint in positions:
-                continue
-
-            age = time.time() - timestamp
-            logger.info(f"[check] {mint} age={int(age)}s")
-
-            if age > MAX_TOKEN_AGE:
-                logger.info(f"[skip] {mint} too old ({int(age)}s)")
-                continue
-
-            if not await has_sufficient_liquidity(mint, MIN_LIQUIDITY_SOL * 1_000_000_000):
-                logger.info(f"[skip] {mint} - low liquidity")
-                continue
-
-            metadata = await get_token_metadata(mint)
-            symbol = metadata.get("symbol", "?")
-
-            buy_result = await buy_token(mint, BUY_AMOUNT_SOL)
-            if buy_result.get("success"):
-                price = await get_token_price(mint)
-                if price > 0:
-                    positions[mint] = {
-                        "buy_price": price,
-                        "symbol": symbol
-                    }
-                    save_positions()
-                    await send_telegram_message(f"🛒 Bought {symbol} ({mint[:5]}...) @ {price:.6f}")
-                else:
-                    logger.warning(f"[price] Failed to fetch price for {mint} after buying")
+    tokens = await get_recent_tokens_from_dbotx(get_session())
+    logger.info(f"[main] Fetched {len(tokens)} tokens")
+
+    for token in tokens:
+        mint = token.get("mint")
+        timestamp = token.get("timestamp")
+
+        if not mint or not timestamp:
+            continue
+
+        if mint in positions:
+            continue
+
+        age = time.time() - timestamp
+        logger.info(f"[check] {mint} age={int(age)}s")
+
+        if age > MAX_TOKEN_AGE:
+            logger.info(f"[skip] {mint} too old ({int(age)}s)")
+            continue
+
+        if not await has_sufficient_liquidity(mint, MIN_LIQUIDITY_SOL * 1_000_000_000):
+            logger.info(f"[skip] {mint} - low liquidity")
+            continue
+
+        metadata = await get_token_metadata(mint)
+        symbol = metadata.get("symbol", "?")
+
+        buy_result = await buy_token(mint, BUY_AMOUNT_SOL)
+        if buy_result.get("success"):
+            price = await price_feed.get_price(mint)
+            if price > 0:
+                positions[mint] = {
+                    "buy_price": price,
+                    "symbol": symbol
+                }
+                save_positions()
+                price_history.record(price_histories, mint, time.time(), price)
+                await price_feed.watch(mint)
+                await send_telegram_message(f"🛒 Bought {symbol} ({mint[:5]}...) @ {price:.6f}")
             else:
-                logger.warning(f"[buy failed] {mint}")
+                logger.warning(f"[price] Failed to fetch price for {mint} after buying")
+        else:
+            logger.warning(f"[buy failed] {mint}")
 
 
 async def main_loop():
@@ -135,12 +166,27 @@ async def main_loop():
 
 
 async def main():
-    load_positions()
-    await asyncio.gather(
-        listen_to_dbotx_trades(),
-        main_loop(),
-        monitor_positions()
+    lag_monitor = asyncio.create_task(loop_monitor.run_lag_monitor())
+    await startup.start_health_server()
+    # State snapshots are independent, read them concurrently off the event loop
+    _, histories = await asyncio.gather(
+        asyncio.to_thread(load_positions),
+        asyncio.to_thread(price_history.load_histories, HISTORY_FILE)
     )
+    for mint, hist in histories.items():
+        if mint in positions:
+            price_histories[mint] = hist
+    try:
+        await startup.warm_up(list(positions))
+        await asyncio.gather(
+            lag_monitor,
+            listen_to_dbotx_trades(),
+            price_feed.run_price_feed(),
+            main_loop(),
+            monitor_positions()
+        )
+    finally:
+        await close_session()
 
 
 if __name__ == "__main__":
@@ -5,6 +5,7 @@ import json
 import os
 from solana.rpc.async_api import AsyncClient
 from utils import execute_buy, send_telegram_message
+from wallet_poller import WalletScheduler
 
 # --- Configuration ---
 WATCHED_WALLETS = [
@@ -42,46 +43,44 @@ def save_cache():
         logging.error(f"Failed to save token cache: {e}")
 
 # --- Copy Trading Logic ---
+async def handle_wallet_update(wallet, data):
+    current_mints = {item['mint'] for item in data.get("tokens", [])}
+    previous_mints = wallet_token_cache.get(wallet, set())
+
+    new_tokens = current_mints - previous_mints
+    for mint in new_tokens:
+        await send_telegram_message(f"🧠 Copying sniper wallet:\n{wallet}\nToken: {mint}")
+        try:
+            success, tx = await execute_buy(mint)
+            if success:
+                await send_telegram_message(f"✅ Copied buy for {mint}\nTx: {tx}")
+            else:
+                await send_telegram_message(f"❌ Copy failed for {mint}: Unknown reason")
+        except Exception as e:
+            logging.error(f"Buy failed for {mint}: {e}")
+            await send_telegram_message(f"❌ Copy failed for {mint}: {e}")
+    if current_mints != previous_mints:
+        wallet_token_cache[wallet] = current_mints
+        save_cache()
+    return len(new_tokens)
+
+
+async def handle_wallet_error(wallet, e):
+    await send_telegram_message(f"❌ Error fetching wallet {wallet}: {e}")
+
+
 async def run_copy_trader_loop():
     load_cache()
+    scheduler = WalletScheduler(WATCHED_WALLETS, handle_wallet_update, handle_wallet_error)
     async with AsyncClient("https://api.mainnet-beta.solana.com") as client:
         async with aiohttp.ClientSession() as session:
             while True:
                 try:
-                    for wallet in WATCHED_WALLETS:
-                        url = f"https://api.pump.fun/wallet/{wallet}"
-                        try:
-                            async with session.get(url, timeout=10) as resp:
-                                if resp.status == 200:
-                                    data = await resp.json()
-                                    current_mints = {item['mint'] for item in data.get("tokens", [])}
-                                    previous_mints = wallet_token_cache.get(wallet, set())
-
-                                    new_tokens = current_mints - previous_mints
-                                    if new_tokens:
-                                        for mint in new_tokens:
-                                            await send_telegram_message(f"🧠 Copying sniper wallet:\n{wallet}\nToken: {mint}")
-                                            try:
-                                                success, tx = await execute_buy(mint)
-                                                if success:
-                                                    await send_telegram_message(f"✅ Copied buy for {mint}\nTx: {tx}")
-                                                else:
-                                                    await send_telegram_message(f"❌ Copy failed for {mint}: Unknown reason")
-                                            except Exception as e:
-                                                logging.error(f"Buy failed for {mint}: {e}")
-                                                await send_telegram_message(f"❌ Copy failed for {mint}: {e}")
-                                    wallet_token_cache[wallet] = current_mints
-                                    save_cache()
-                                else:
-                                    logging.warning(f"Pump.fun API error for wallet {wallet}: HTTP {resp.status}")
-                        except Exception as e:
-                            logging.error(f"Wallet fetch error [{wallet}]: {e}")
-                            await send_telegram_message(f"❌ Error fetching wallet {wallet}: {e}")
+                    await scheduler.run(session)
                 except Exception as e:
                     logging.error(f"[Copy Trader Error]: {e}")
                     await send_telegram_message(f"❌ Copy trader loop error: {e}")
-
-                await asyncio.sleep(15)
+                    await asyncio.sleep(15)
 
 # --- Entrypoint ---
 if __name__ == "__main__":
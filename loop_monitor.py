@@ -0,0 +1,189 @@
+import asyncio
+import hmac
+import logging
+import math
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from aiohttp import web
+
+logger = logging.getLogger("loop_monitor")
+
+SLOW_CALLBACK = 0.1          # seconds the loop may block before we report it
+LAG_INTERVAL = SLOW_CALLBACK / 4  # seconds between lag probes, also the error bound on measured stalls
+PROFILE_INTERVAL = 0.005     # seconds between profiler samples
+PROFILE_MIN_INTERVAL = 0.001
+PROFILE_MAX_SECONDS = 300
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+stats = {
+    "lag_last": 0.0,
+    "lag_max": 0.0,
+    "lag_avg": 0.0,
+    "probes": 0,
+    "slow_callbacks": 0,
+}
+slow_log = []                # most recent blocking events, newest last
+SLOW_LOG_SIZE = 50
+
+_loop = None
+_loop_thread_id = None
+_expected = time.monotonic()  # when the lag probe should next wake up
+_profile = {"thread": None, "stop": None, "stacks": Counter(), "samples": 0, "started": 0.0}
+
+
+def _frame_stack(frame):
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _describe_task(task):
+    if task is None:
+        return "<no task>"
+    coro = task.get_coro()
+    return f"{task.get_name()} ({getattr(coro, '__qualname__', coro)})"
+
+
+def _watchdog():
+    """
+    Runs in a thread: once the lag probe is overdue, capture the task and stack
+    holding the loop. When the probe finally wakes, its measured lag is how
+    long the loop was blocked, and the capture is kept if that is SLOW_CALLBACK
+    or more.
+    """
+    event = None
+    seen = 0
+    while True:
+        time.sleep(SLOW_CALLBACK / 4)
+        if stats["probes"] != seen:
+            seen = stats["probes"]
+            lag = stats["lag_last"]
+            if lag >= SLOW_CALLBACK:
+                if event is None:
+                    # Blocked and released between two of our checks
+                    event = {"time": time.time() - lag, "task": "<not captured>", "stack": []}
+                event["blocked_for"] = round(lag, 3)
+                stats["slow_callbacks"] += 1
+                slow_log.append(event)
+                del slow_log[:-SLOW_LOG_SIZE]
+                where = " <- ".join(reversed(event["stack"][-3:])) or "unknown"
+                logger.warning(f"[lag] Event loop blocked {event['blocked_for']}s in {event['task']} at {where}")
+            event = None
+        if event is None and time.monotonic() - _expected >= SLOW_CALLBACK / 2:
+            # Capture the culprit while it still holds the loop, dropped above if the stall stays short
+            frame = sys._current_frames().get(_loop_thread_id)
+            event = {
+                "time": time.time(),
+                "task": _describe_task(asyncio.current_task(_loop)),
+                "stack": _frame_stack(frame)[-8:] if frame else [],
+            }
+
+
+async def run_lag_monitor():
+    """Measure how late the loop wakes us up, which the watchdog uses to time stalls."""
+    global _loop, _loop_thread_id, _expected
+    _loop = asyncio.get_running_loop()
+    _loop_thread_id = threading.get_ident()
+    _expected = time.monotonic() + LAG_INTERVAL
+    threading.Thread(target=_watchdog, name="loop-watchdog", daemon=True).start()
+    while True:
+        _expected = time.monotonic() + LAG_INTERVAL
+        await asyncio.sleep(LAG_INTERVAL)
+        lag = max(0.0, time.monotonic() - _expected)
+        stats["lag_last"] = lag
+        stats["lag_max"] = max(stats["lag_max"], lag)
+        stats["lag_avg"] += 0.05 * (lag - stats["lag_avg"])
+        # Bumped last, the watchdog reads lag_last once it sees a new probe
+        stats["probes"] += 1
+
+
+# --- Sampling profiler ---
+def _sampler(stop, interval, deadline):
+    while not stop.is_set() and time.monotonic() < deadline:
+        frame = sys._current_frames().get(_loop_thread_id)
+        if frame is not None:
+            _profile["stacks"][";".join(_frame_stack(frame))] += 1
+            _profile["samples"] += 1
+        time.sleep(interval)
+
+
+def start_profiler(interval=PROFILE_INTERVAL, seconds=PROFILE_MAX_SECONDS):
+    if _profile["thread"] is not None and _profile["thread"].is_alive():
+        return False
+    stop = threading.Event()
+    _profile.update(stop=stop, stacks=Counter(), samples=0, started=time.time())
+    _profile["thread"] = threading.Thread(
+        target=_sampler,
+        args=(stop, interval, time.monotonic() + seconds),
+        name="loop-profiler",
+        daemon=True
+    )
+    _profile["thread"].start()
+    return True
+
+
+def stop_profiler():
+    if _profile["stop"] is not None:
+        _profile["stop"].set()
+    if _profile["thread"] is not None:
+        _profile["thread"].join()
+        _profile["thread"] = None
+
+
+def collapsed_stacks():
+    """Profile in collapsed-stack format, ready for flamegraph.pl / speedscope."""
+    return "\n".join(f"{stack} {count}" for stack, count in _profile["stacks"].most_common())
+
+
+# --- HTTP handlers ---
+def _authorized(request):
+    # Admin routes stay closed unless a token is configured
+    if not ADMIN_TOKEN:
+        return False
+    return hmac.compare_digest(request.headers.get("x-admin-token", ""), ADMIN_TOKEN)
+
+
+async def metrics(request):
+    body = {"loop": {k: round(v, 4) if isinstance(v, float) else v for k, v in stats.items()}}
+    # Task names and code stacks are only for admins, anyone else gets the numbers
+    if _authorized(request):
+        body["slow_callbacks"] = slow_log[-10:]
+        body["profiling"] = _profile["thread"] is not None and _profile["thread"].is_alive()
+    return web.json_response(body)
+
+
+async def profile_start(request):
+    if not _authorized(request):
+        return web.Response(status=403)
+    try:
+        interval = float(request.query.get("interval", PROFILE_INTERVAL))
+        seconds = float(request.query.get("seconds", PROFILE_MAX_SECONDS))
+    except ValueError:
+        return web.json_response({"error": "interval and seconds must be numbers"}, status=400)
+    if not math.isfinite(interval) or not math.isfinite(seconds) or seconds <= 0:
+        return web.json_response({"error": "interval and seconds must be positive numbers"}, status=400)
+    interval = max(interval, PROFILE_MIN_INTERVAL)
+    started = start_profiler(interval, min(seconds, PROFILE_MAX_SECONDS))
+    return web.json_response({"started": started}, status=200 if started else 409)
+
+
+async def profile_stop(request):
+    if not _authorized(request):
+        return web.Response(status=403)
+    await asyncio.to_thread(stop_profiler)
+    logger.info(f"[profile] Collected {_profile['samples']} samples")
+    return web.Response(text=collapsed_stacks() + "\n", content_type="text/plain")
+
+
+def add_routes(app):
+    app.router.add_get("/metrics", metrics)
+    app.router.add_post("/admin/profile/start", profile_start)
+    app.router.add_post("/admin/profile/stop", profile_stop)
@@ -0,0 +1,276 @@
+import asyncio
+import base64
+import json
+import logging
+import os
+import struct
+import time
+from typing import Dict, Optional, Set
+
+import aiohttp
+
+from utils import RPC_URL, get_session, get_token_price
+
+logger = logging.getLogger("price_feed")
+
+RPC_WS_URL = os.getenv("RPC_WS_URL", "wss://api.mainnet-beta.solana.com")
+PUMP_PROGRAM_ID = "6EF8rrecthR5Dq8DybwXJ7rN3ncUrC7J6QcUqNuhcPX7"
+SOL_MINT = "So11111111111111111111111111111111111111112"
+
+TOKEN_DECIMALS = 6
+LAMPORTS_PER_SOL = 1_000_000_000
+SOL_USD_REFRESH = 30  # seconds
+SUBSCRIBE_RETRY = 5   # seconds before retrying a failed accountSubscribe
+
+# 8-byte anchor discriminator, then virtual_token_reserves, virtual_sol_reserves,
+# real_token_reserves, real_sol_reserves, token_total_supply (u64 LE) and complete (bool)
+BONDING_CURVE_LAYOUT = struct.Struct("<8xQQQQQ?")
+
+watched: Dict[str, str] = {}          # mint -> bonding curve account
+_sub_ids: Dict[int, str] = {}         # subscription id -> mint
+_live: Set[str] = set()               # mints with a confirmed subscription on the current socket
+_pending: Dict[int, str] = {}         # request id -> mint
+_prices: Dict[str, float] = {}        # mint -> spot price in SOL, from notifications only
+_undecodable: Set[str] = set()        # watched mints that only Jupiter can price
+_changed: Set[str] = set()            # mints with a new on-chain price since the last wait_for_update
+_sol_usd = {"price": 0.0, "fetched": 0.0}
+_updated = asyncio.Event()
+_ws = None
+_next_id = 0
+_retries: Set[asyncio.Task] = set()
+
+
+def bonding_curve_address(mint: str) -> str:
+    # solders is only needed here, keep it off the startup path
+    from solders.pubkey import Pubkey
+
+    pda, _ = Pubkey.find_program_address(
+        [b"bonding-curve", bytes(Pubkey.from_string(mint))],
+        Pubkey.from_string(PUMP_PROGRAM_ID)
+    )
+    return str(pda)
+
+
+def decode_bonding_curve(data: bytes) -> Optional[dict]:
+    """
+    Decode a pump.fun bonding curve account.
+    Returns None if the data does not look like a live curve.
+    """
+    if len(data) < BONDING_CURVE_LAYOUT.size:
+        return None
+    virtual_token, virtual_sol, real_token, real_sol, supply, complete = \
+        BONDING_CURVE_LAYOUT.unpack_from(data)
+    if complete or virtual_token == 0:
+        return None
+    return {
+        "virtual_token_reserves": virtual_token,
+        "virtual_sol_reserves": virtual_sol,
+        "real_token_reserves": real_token,
+        "real_sol_reserves": real_sol,
+        "token_total_supply": supply,
+    }
+
+
+def spot_price_sol(reserves: dict) -> float:
+    sol = reserves["virtual_sol_reserves"] / LAMPORTS_PER_SOL
+    tokens = reserves["virtual_token_reserves"] / 10 ** TOKEN_DECIMALS
+    return sol / tokens
+
+
+async def get_sol_usd() -> float:
+    now = time.time()
+    if now - _sol_usd["fetched"] > SOL_USD_REFRESH:
+        price = await get_token_price(SOL_MINT)
+        if price > 0:
+            _sol_usd["price"] = float(price)
+            _sol_usd["fetched"] = now
+    return _sol_usd["price"]
+
+
+async def fetch_price_sol(mint: str) -> Optional[float]:
+    """
+    One-shot read of the bonding curve account, for mints without a live subscription.
+    Returns 0 if the account is missing or can't be decoded, None if the request failed.
+    """
+    try:
+        account = watched.get(mint) or bonding_curve_address(mint)
+        payload = {
+            "jsonrpc": "2.0",
+            "id": 1,
+            "method": "getAccountInfo",
+            "params": [account, {"encoding": "base64", "commitment": "processed"}]
+        }
+        async with get_session().post(RPC_URL, json=payload, timeout=10) as resp:
+            if resp.status != 200:
+                logger.debug(f"[feed] Account fetch for {mint}: HTTP {resp.status}")
+                return None
+            data = await resp.json()
+    except Exception as e:
+        logger.debug(f"[feed] Account fetch failed for {mint}: {e}")
+        return None
+    if "result" not in data:
+        logger.debug(f"[feed] Account fetch for {mint}: {data.get('error')}")
+        return None
+    value = data["result"].get("value")
+    if not value:
+        return 0
+    try:
+        reserves = decode_bonding_curve(base64.b64decode(value["data"][0]))
+    except Exception as e:
+        logger.debug(f"[feed] Undecodable account for {mint}: {e}")
+        return 0
+    return spot_price_sol(reserves) if reserves else 0
+
+
+async def get_price(mint: str) -> float:
+    """
+    Return the USD price of a mint, computed from on-chain reserves when the
+    account is decodable, otherwise fetched from Jupiter.
+
+    The price pushed by a live subscription is served as is; without one the
+    account is read fresh on every call, so a dead subscription can't leave a
+    frozen price behind.
+    """
+    price_sol = _prices.get(mint) if mint in _live else None
+    if not price_sol and mint not in _undecodable:
+        price_sol = await fetch_price_sol(mint)
+        # Only a successful read that fails to decode sends the mint to Jupiter for good,
+        # a failed request just falls back for this call
+        if price_sol == 0 and mint in watched:
+            _undecodable.add(mint)
+    if price_sol:
+        sol_usd = await get_sol_usd()
+        if sol_usd > 0:
+            return price_sol * sol_usd
+    return await get_token_price(mint)
+
+
+async def wait_for_update(timeout: float) -> Set[str]:
+    """
+    Sleep until a watched account gets a new on-chain price, or until the
+    timeout elapses. Returns the mints whose price changed (empty on timeout).
+    """
+    if not _changed:
+        try:
+            await asyncio.wait_for(_updated.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+    _updated.clear()
+    changed = set(_changed)
+    _changed.clear()
+    return changed
+
+
+async def _subscribe(mint: str):
+    global _next_id
+    _next_id += 1
+    _pending[_next_id] = mint
+    await _ws.send_json({
+        "jsonrpc": "2.0",
+        "id": _next_id,
+        "method": "accountSubscribe",
+        "params": [watched[mint], {"encoding": "base64", "commitment": "processed"}]
+    })
+
+
+async def _retry_subscribe(mint: str):
+    await asyncio.sleep(SUBSCRIBE_RETRY)
+    if mint in watched and mint not in _live and _ws is not None and not _ws.closed:
+        await _subscribe(mint)
+
+
+async def watch(mint: str):
+    if mint in watched:
+        return
+    try:
+        watched[mint] = bonding_curve_address(mint)
+    except Exception as e:
+        logger.warning(f"[feed] Cannot derive bonding curve for {mint}: {e}")
+        return
+    if _ws is not None and not _ws.closed:
+        await _subscribe(mint)
+
+
+async def unwatch(mint: str):
+    global _next_id
+    watched.pop(mint, None)
+    _prices.pop(mint, None)
+    _live.discard(mint)
+    _undecodable.discard(mint)
+    _changed.discard(mint)
+    for sub_id, sub_mint in list(_sub_ids.items()):
+        if sub_mint != mint:
+            continue
+        del _sub_ids[sub_id]
+        if _ws is not None and not _ws.closed:
+            _next_id += 1
+            await _ws.send_json({
+                "jsonrpc": "2.0",
+                "id": _next_id,
+                "method": "accountUnsubscribe",
+                "params": [sub_id]
+            })
+
+
+def _handle_message(msg: dict):
+    if "id" in msg and msg["id"] in _pending:
+        mint = _pending.pop(msg["id"])
+        if "result" in msg and mint in watched:
+            _sub_ids[msg["result"]] = mint
+            _live.add(mint)
+        elif "error" in msg:
+            logger.warning(f"[feed] Subscribe failed for {mint}, retrying in {SUBSCRIBE_RETRY}s: {msg['error']}")
+            task = asyncio.get_running_loop().create_task(_retry_subscribe(mint))
+            _retries.add(task)
+            task.add_done_callback(_retries.discard)
+        return
+
+    if msg.get("method") != "accountNotification":
+        return
+    params = msg.get("params", {})
+    mint = _sub_ids.get(params.get("subscription"))
+    if not mint:
+        return
+    try:
+        raw = base64.b64decode(params["result"]["value"]["data"][0])
+        reserves = decode_bonding_curve(raw)
+    except Exception as e:
+        logger.debug(f"[feed] Undecodable update for {mint}: {e}")
+        reserves = None
+
+    if reserves is None:
+        # Migrated or unknown account layout, let get_price fall back to Jupiter
+        _prices.pop(mint, None)
+        _undecodable.add(mint)
+    else:
+        _prices[mint] = spot_price_sol(reserves)
+        _undecodable.discard(mint)
+        _changed.add(mint)
+        _updated.set()
+
+
+async def run_price_feed():
+    global _ws
+    while True:
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.ws_connect(RPC_WS_URL, heartbeat=30) as ws:
+                    _ws = ws
+                    logger.info(f"[feed] Connected, subscribing to {len(watched)} accounts")
+                    for mint in list(watched):
+                        await _subscribe(mint)
+                    async for msg in ws:
+                        if msg.type == aiohttp.WSMsgType.TEXT:
+                            _handle_message(json.loads(msg.data))
+                        elif msg.type == aiohttp.WSMsgType.ERROR:
+                            logger.error(f"[feed] Error: {msg.data}")
+        except Exception as e:
+            logger.error(f"[feed] Connection error: {e}")
+        finally:
+            _ws = None
+            _sub_ids.clear()
+            _live.clear()
+            _pending.clear()
+            _prices.clear()
+            _undecodable.clear()
+        await asyncio.sleep(5)
@@ -0,0 +1,205 @@
+import asyncio
+import logging
+import math
+import os
+import struct
+from array import array
+from typing import Dict
+
+logger = logging.getLogger("price_history")
+
+HISTORY_CAPACITY = 300     # samples kept per position
+SAMPLE_INTERVAL = 1.0      # minimum seconds between stored samples
+EMA_TAU = 60.0             # seconds, time constant of the EMA and volatility
+VOLATILITY_HORIZON = 60.0  # seconds, volatility is reported per this horizon
+
+SNAPSHOT_MAGIC = b"PHST"
+SNAPSHOT_VERSION = 2
+_FILE_HEADER = struct.Struct("<4sHI")        # magic, version, number of positions
+# capacity, head, count, start, entry, max, min, ema, ewm_var, last_time, last_seen
+_HEADER = struct.Struct("<IIIdddddddd")
+
+
+class PriceHistory:
+    """
+    Fixed-size ring buffer of (timestamp, price) samples for one position.
+
+    Samples are packed as float32 in two `array`s, with timestamps stored as
+    seconds since the first sample, so a full buffer costs 8 bytes per sample.
+    At most one sample per SAMPLE_INTERVAL is stored, so bursts of updates
+    don't flush the buffer.
+
+    Max/min since entry, EMA and an EWMA volatility of log returns are kept
+    up to date on every append, so reading them is O(1). The EMA weights are
+    scaled by the time since the previous price (alpha = 1 - exp(-dt/EMA_TAU)),
+    so they mean the same thing whether prices arrive every slot or every minute.
+    """
+
+    __slots__ = (
+        "capacity", "times", "prices", "head", "count", "start",
+        "entry_price", "max_price", "min_price", "ema", "ewm_var",
+        "last_time", "last_seen"
+    )
+
+    def __init__(self, capacity: int = HISTORY_CAPACITY):
+        self.capacity = capacity
+        self.times = array("f", bytes(4 * capacity))
+        self.prices = array("f", bytes(4 * capacity))
+        self.head = 0
+        self.count = 0
+        self.start = 0.0
+        self.entry_price = 0.0
+        self.max_price = 0.0
+        self.min_price = 0.0
+        self.ema = 0.0
+        self.ewm_var = 0.0      # variance of log returns per second
+        self.last_time = 0.0
+        self.last_seen = 0.0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, timestamp: float, price: float):
+        if price <= 0:
+            return
+        if self.count == 0:
+            self.start = timestamp
+            self.entry_price = self.max_price = self.min_price = self.ema = price
+        else:
+            dt = timestamp - self.last_time
+            if dt > 0:
+                alpha = 1 - math.exp(-dt / EMA_TAU)
+                ret = math.log(price / self.last_seen)
+                self.ewm_var += alpha * (ret * ret / dt - self.ewm_var)
+                self.ema += alpha * (price - self.ema)
+            self.max_price = max(self.max_price, price)
+            self.min_price = min(self.min_price, price)
+        self.last_time = timestamp
+        self.last_seen = price
+
+        last_stored = self.start + self.times[(self.head - 1) % self.capacity]
+        if self.count and timestamp - last_stored < SAMPLE_INTERVAL:
+            return
+        self.times[self.head] = timestamp - self.start
+        self.prices[self.head] = price
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    @property
+    def last_price(self) -> float:
+        return self.last_seen
+
+    @property
+    def volatility(self) -> float:
+        """EWMA standard deviation of log returns over VOLATILITY_HORIZON seconds."""
+        return math.sqrt(self.ewm_var * VOLATILITY_HORIZON)
+
+    @property
+    def drawdown(self) -> float:
+        """Fraction the last price sits below the max since entry."""
+        if self.max_price <= 0:
+            return 0.0
+        return 1 - self.last_price / self.max_price
+
+    def samples(self):
+        """Yield (timestamp, price) pairs, oldest first."""
+        first = (self.head - self.count) % self.capacity
+        for i in range(self.count):
+            idx = (first + i) % self.capacity
+            yield self.start + self.times[idx], self.prices[idx]
+
+    def to_bytes(self) -> bytes:
+        header = _HEADER.pack(
+            self.capacity, self.head, self.count, self.start, self.entry_price,
+            self.max_price, self.min_price, self.ema, self.ewm_var,
+            self.last_time, self.last_seen
+        )
+        return header + self.times.tobytes() + self.prices.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes, offset: int = 0) -> "PriceHistory":
+        capacity, head, count, start, entry, max_p, min_p, ema, ewm_var, last_time, last_seen = \
+            _HEADER.unpack_from(data, offset)
+        if capacity == 0 or head >= capacity or count > capacity:
+            raise ValueError(f"bad header (capacity={capacity}, head={head}, count={count})")
+        if len(data) - offset < _HEADER.size + 8 * capacity:
+            raise ValueError(f"truncated record, expected {8 * capacity} bytes of samples")
+        hist = cls(capacity)
+        hist.head, hist.count, hist.start = head, count, start
+        hist.entry_price, hist.max_price, hist.min_price = entry, max_p, min_p
+        hist.ema, hist.ewm_var = ema, ewm_var
+        hist.last_time, hist.last_seen = last_time, last_seen
+        offset += _HEADER.size
+        size = 4 * capacity
+        hist.times = array("f", data[offset:offset + size])
+        hist.prices = array("f", data[offset + size:offset + 2 * size])
+        return hist
+
+    @property
+    def nbytes(self) -> int:
+        return _HEADER.size + 8 * self.capacity
+
+
+def record(histories: Dict[str, PriceHistory], mint: str, timestamp: float, price: float):
+    hist = histories.get(mint)
+    if hist is None:
+        hist = histories[mint] = PriceHistory()
+    try:
+        hist.append(timestamp, price)
+    except Exception as e:
+        # History is best-effort, never let a bad buffer break the caller's trading loop
+        logger.warning(f"[history] Dropping history for {mint}: {e}")
+        histories.pop(mint, None)
+
+
+def _write_snapshot(data: bytes, path: str):
+    tmp_file = path + ".tmp"
+    with open(tmp_file, "wb") as f:
+        f.write(data)
+    os.replace(tmp_file, path)
+
+
+async def save_histories(histories: Dict[str, PriceHistory], path: str):
+    # Serialize on the loop (buffers may change between awaits), write in a worker thread
+    parts = [_FILE_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(histories))]
+    for mint, hist in histories.items():
+        key = mint.encode()
+        parts.append(struct.pack("<H", len(key)))
+        parts.append(key)
+        parts.append(hist.to_bytes())
+    try:
+        await asyncio.to_thread(_write_snapshot, b"".join(parts), path)
+    except Exception as e:
+        logger.warning(f"[history] Failed to write {path}: {e}")
+
+
+def load_histories(path: str) -> Dict[str, PriceHistory]:
+    histories: Dict[str, PriceHistory] = {}
+    if not os.path.exists(path):
+        return histories
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, n = _FILE_HEADER.unpack_from(data)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            logger.warning(f"[history] Ignoring {path}: unknown snapshot format")
+            return histories
+    except Exception as e:
+        logger.warning(f"[history] Failed to load {path}: {e}")
+        return histories
+
+    offset = _FILE_HEADER.size
+    for _ in range(n):
+        try:
+            (key_len,) = struct.unpack_from("<H", data, offset)
+            offset += 2
+            mint = data[offset:offset + key_len].decode()
+            offset += key_len
+            hist = PriceHistory.from_bytes(data, offset)
+        except Exception as e:
+            # Record boundaries past a bad entry can't be trusted, keep what loaded so far
+            logger.warning(f"[history] Dropping the rest of {path} after {len(histories)} entries: {e}")
+            break
+        offset += hist.nbytes
+        histories[mint] = hist
+    return histories
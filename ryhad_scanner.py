@@ -6,7 +6,10 @@ import os
 import time
 from typing import Dict, Set, Any
 
-from utils import execute_buy, execute_sell, get_token_price, send_telegram_message
+from utils import execute_buy, execute_sell, send_telegram_message
+import price_feed
+import price_history
+from wallet_poller import WalletScheduler
 
 # --- Copy Trading Setup ---
 WATCHED_WALLETS = [
@@ -23,6 +26,10 @@ auto_trade_seen: Set[str] = set()
 # --- Shared Position Tracking ---
 POSITIONS_FILE = "positions.json"
 positions: Dict[str, Dict[str, Any]] = {}
+HISTORY_FILE = "price_history.bin"
+HISTORY_SAVE_INTERVAL = 30  # seconds
+MONITOR_INTERVAL = 60       # seconds between full position checks
+price_histories: Dict[str, price_history.PriceHistory] = {}
 
 CACHE_FILE = "token_cache.json"
 AUTO_TRADE_SEEN_FILE = "auto_trade_seen.json"
@@ -94,43 +101,44 @@ def load_auto_trade_seen():
         auto_trade_seen = set()
 
 # --- Copy-trading sniper wallets ---
+async def handle_wallet_update(wallet, data):
+    current_mints = {item['mint'] for item in data.get("tokens", [])}
+    prev_mints = wallet_token_cache.get(wallet, set())
+    new_tokens = current_mints - prev_mints
+    for mint in new_tokens:
+        await send_telegram_message(f"🧠 Copying sniper: {wallet}\nToken: {mint}")
+        try:
+            success, tx = await execute_buy(mint, amount_usd=5)
+            if success:
+                price = await price_feed.get_price(mint)
+                positions[mint] = {
+                    "buy_price": price,
+                    "tx": tx,
+                    "timestamp": time.time(),
+                    "wallet": wallet
+                }
+                save_positions()
+                price_history.record(price_histories, mint, time.time(), price)
+                await price_feed.watch(mint)
+                await send_telegram_message(f"✅ Bought: {mint} at ${price:.4f}\nTx: {tx}")
+            else:
+                await send_telegram_message(f"❌ Copy failed for {mint}")
+        except Exception as e:
+            await send_telegram_message(f"❌ Copy error for {mint}: {e}")
+    if current_mints != prev_mints:
+        wallet_token_cache[wallet] = current_mints
+        save_cache()
+    return len(new_tokens)
+
+async def handle_wallet_error(wallet, e):
+    await send_telegram_message(f"❌ Error fetching {wallet}: {e}")
+
+wallet_scheduler = WalletScheduler(WATCHED_WALLETS, handle_wallet_update, handle_wallet_error)
+
 async def run_copy_trader_loop():
     logging.info("🔁 Copy-trader loop started.")
     async with aiohttp.ClientSession() as session:
-        while True:
-            for wallet in WATCHED_WALLETS:
-                url = f"https://api.pump.fun/wallet/{wallet}"
-                try:
-                    async with session.get(url, timeout=10) as resp:
-                        if resp.status == 200:
-                            data = await resp.json()
-                            current_mints = {item['mint'] for item in data.get("tokens", [])}
-                            prev_mints = wallet_token_cache.get(wallet, set())
-                            new_tokens = current_mints - prev_mints
-                            for mint in new_tokens:
-                                await send_telegram_message(f"🧠 Copying sniper: {wallet}\nToken: {mint}")
-                                try:
-                                    success, tx = await execute_buy(mint, amount_usd=5)
-                                    if success:
-                                        price = await get_token_price(mint)
-                                        positions[mint] = {
-                                            "buy_price": price,
-                                            "tx": tx,
-                                            "timestamp": time.time()
-                                        }
-                                        save_positions()
-                                        await send_telegram_message(f"✅ Bought: {mint} at ${price:.4f}\nTx: {tx}")
-                                    else:
-                                        await send_telegram_message(f"❌ Copy failed for {mint}")
-                                except Exception as e:
-                                    await send_telegram_message(f"❌ Copy error for {mint}: {e}")
-                            wallet_token_cache[wallet] = current_mints
-                            save_cache()
-                        elif resp.status == 404:
-                            logging.info(f"Wallet {wallet} not tracked (404).")
-                except Exception as e:
-                    await send_telegram_message(f"❌ Error fetching {wallet}: {e}")
-            await asyncio.sleep(15)
+        await wallet_scheduler.run(session)
 
 # --- Auto trading logic: scan and buy new tokens from Raydium ---
 async def scan_raydium():
@@ -169,13 +177,15 @@ async def run_auto_trader():
                     try:
                         success, tx = await execute_buy(mint, amount_usd=5)
                         if success:
-                            price = await get_token_price(mint)
+                            price = await price_feed.get_price(mint)
                             positions[mint] = {
                                 "buy_price": price,
                                 "tx": tx,
                                 "timestamp": time.time()
                             }
                             save_positions()
+                            price_history.record(price_histories, mint, time.time(), price)
+                            await price_feed.watch(mint)
                             await send_telegram_message(f"✅ Raydium Bought: {mint} at ${price:.4f}\nTx: {tx}")
                             auto_trade_seen.add(mint)
                             save_auto_trade_seen()
@@ -193,28 +203,63 @@ async def run_auto_trader():
 # --- Auto-sell logic: Sell at 2x ---
 async def monitor_positions_and_sell():
     load_positions()
+    for mint, hist in price_history.load_histories(HISTORY_FILE).items():
+        if mint in positions:
+            price_histories[mint] = hist
+    for mint in positions:
+        await price_feed.watch(mint)
     logging.info("📈 Position monitor started.")
+    last_history_save = 0.0
+    last_full_check = 0.0
+    changed = set()
     while True:
+        # Full pass every MONITOR_INTERVAL, otherwise only mints whose on-chain price moved
+        full_check = time.time() - last_full_check >= MONITOR_INTERVAL
+        if full_check:
+            mints = list(positions.keys())
+            last_full_check = time.time()
+        else:
+            mints = [mint for mint in changed if mint in positions]
         to_remove = []
-        for mint, data in positions.items():
+        marks: Dict[str, list] = {}
+        for mint in mints:
+            data = positions[mint]
             try:
                 buy_price = float(data["buy_price"])
-                current_price = await get_token_price(mint)
+                current_price = await price_feed.get_price(mint)
                 if current_price >= buy_price * 2:
                     await send_telegram_message(f"💰 Selling {mint} at 2x: ${current_price:.4f}")
                     success, tx = await execute_sell(mint)
                     if success:
                         await send_telegram_message(f"✅ Sold {mint}\nTx: {tx}")
                         to_remove.append(mint)
+                        if data.get("wallet") and buy_price > 0:
+                            wallet_scheduler.record_result(data["wallet"], current_price / buy_price)
                     else:
                         await send_telegram_message(f"❌ Sell failed for {mint}")
+                if mint in to_remove:
+                    continue
+                price_history.record(price_histories, mint, time.time(), current_price)
+                if data.get("wallet") and buy_price > 0 and current_price > 0:
+                    marks.setdefault(data["wallet"], []).append(current_price / buy_price)
             except Exception as e:
                 logging.error(f"Sell check failed for {mint}: {e}")
         for mint in to_remove:
             positions.pop(mint, None)
+            price_histories.pop(mint, None)
+            await price_feed.unwatch(mint)
+        if full_check:
+            # Open copied positions count towards their source wallet's poll weight, losses included
+            for wallet in wallet_scheduler.wallets:
+                wallet_scheduler.mark_to_market(wallet, marks.get(wallet, []))
         if to_remove:
             save_positions()
-        await asyncio.sleep(60)
+        if time.time() - last_history_save >= HISTORY_SAVE_INTERVAL:
+            await price_history.save_histories(price_histories, HISTORY_FILE)
+            last_history_save = time.time()
+        changed = await price_feed.wait_for_update(
+            max(0.0, last_full_check + MONITOR_INTERVAL - time.time())
+        )
 
 # --- Entrypoint ---
 if __name__ == "__main__":
@@ -228,7 +273,8 @@ if __name__ == "__main__":
             await asyncio.gather(
                 run_copy_trader_loop(),
                 run_auto_trader(),
-                monitor_positions_and_sell()
+                monitor_positions_and_sell(),
+                price_feed.run_price_feed()
             )
         asyncio.run(main())
     except Exception as e:
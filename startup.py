@@ -0,0 +1,90 @@
+import asyncio
+import logging
+import os
+import time
+
+from aiohttp import web
+
+import loop_monitor
+import price_feed
+from utils import (
+    DBOTX_BASE_URL,
+    RPC_URL,
+    check_config,
+    get_latest_blockhash,
+    get_session
+)
+
+logger = logging.getLogger("startup")
+
+HEALTH_PORT = int(os.getenv("PORT", "10000"))
+WARMUP_TIMEOUT = 10  # seconds each warm-up step may take before we give up on it
+WARM_URLS = [
+    DBOTX_BASE_URL,
+    "https://price.jup.ag",
+    "https://quote-api.jup.ag",
+    "https://api.telegram.org",
+    RPC_URL,
+]
+
+state = {"ready": False, "started": time.time(), "ready_at": None}
+app = web.Application()
+
+
+async def health(request):
+    body = {
+        "ready": state["ready"],
+        "uptime": round(time.time() - state["started"], 1),
+        "warmup_seconds": state["ready_at"] and round(state["ready_at"] - state["started"], 2),
+    }
+    return web.json_response(body, status=200 if state["ready"] else 503)
+
+app.router.add_get("/health", health)
+loop_monitor.add_routes(app)
+
+
+async def start_health_server():
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "0.0.0.0", HEALTH_PORT).start()
+    logger.info(f"[startup] Health endpoint listening on :{HEALTH_PORT}")
+    return runner
+
+
+async def _warm_host(url):
+    # Any response will do, the point is to leave a resolved, TLS-established
+    # connection in the shared pool
+    try:
+        async with get_session().head(url, timeout=10) as resp:
+            await resp.read()
+    except Exception as e:
+        logger.warning(f"[startup] Could not warm {url}: {e}")
+
+
+async def _prime_price(mint):
+    await price_feed.watch(mint)
+    await price_feed.get_price(mint)
+
+
+async def _bounded(coro, what):
+    # A hung upstream must not keep /health at 503, a cold cache is fine
+    try:
+        await asyncio.wait_for(coro, WARMUP_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning(f"[startup] {what} timed out after {WARMUP_TIMEOUT}s, continuing")
+    except Exception as e:
+        logger.warning(f"[startup] {what} failed: {e}")
+
+
+async def warm_up(mints):
+    """Open upstream connections and prime caches, then mark the bot ready."""
+    check_config()
+    await asyncio.gather(*(_bounded(_warm_host(url), f"warming {url}") for url in WARM_URLS))
+    await asyncio.gather(
+        _bounded(get_latest_blockhash(), "blockhash prefetch"),
+        _bounded(price_feed.get_sol_usd(), "SOL/USD price"),
+        *(_bounded(_prime_price(mint), f"pricing {mint}") for mint in mints)
+    )
+    state["ready"] = True
+    state["ready_at"] = time.time()
+    logger.info(f"[startup] Ready in {state['ready_at'] - state['started']:.2f}s ({len(mints)} open positions)")
@@ -3,6 +3,7 @@ import asyncio
 import logging
 import os
 import json
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -13,9 +14,7 @@ logger = logging.getLogger("utils")
 DBOTX_API_KEY = os.getenv("DBOTX_API_KEY")
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
-
-if not DBOTX_API_KEY:
-    raise RuntimeError("Missing DBOTX_API_KEY in .env")
+RPC_URL = os.getenv("RPC_URL", "https://api.mainnet-beta.solana.com")
 
 DBOTX_BASE_URL = "https://api-data-v1.dbotx.com"
 DBOTX_TRADE_URL = "https://api-bot-v1.dbotx.com"
@@ -25,6 +24,33 @@ HEADERS = {
     "x-api-key": DBOTX_API_KEY
 }
 
+BLOCKHASH_TTL = 30  # seconds
+HTTP_TIMEOUT = 20   # seconds, default total timeout for requests on the shared session
+
+_session = None
+_blockhash = {"blockhash": None, "fetched": 0.0}
+
+
+def check_config():
+    if not DBOTX_API_KEY:
+        raise RuntimeError("Missing DBOTX_API_KEY in .env")
+
+
+def get_session():
+    """Shared HTTP session, so upstream connections and DNS lookups are reused across calls."""
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=100, ttl_dns_cache=300, keepalive_timeout=60),
+            timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT)
+        )
+    return _session
+
+
+async def close_session():
+    if _session is not None and not _session.closed:
+        await _session.close()
+
 
 async def get_json(session, url):
     try:
@@ -54,26 +80,24 @@ async def get_recent_tokens_from_dbotx(session):
 
 async def has_sufficient_liquidity(mint, min_liquidity_lamports):
     url = f"https://quote-api.jup.ag/v6/pools?inputMint={mint}&outputMint=So11111111111111111111111111111111111111112"
-    async with aiohttp.ClientSession() as session:
-        data = await get_json(session, url)
-        if not data:
-            return False
-        for pool in data.get("pools", []):
-            if pool.get("liquidity", 0) >= min_liquidity_lamports:
-                return True
+    data = await get_json(get_session(), url)
+    if not data:
         return False
+    for pool in data.get("pools", []):
+        if pool.get("liquidity", 0) >= min_liquidity_lamports:
+            return True
+    return False
 
 
 async def get_token_metadata(token_address: str) -> dict:
     url = f"{DBOTX_BASE_URL}/token/metadata?chain=solana&tokenAddress={token_address}"
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, headers=HEADERS) as resp:
-            if resp.status == 200:
-                data = await resp.json()
-                return data.get("data", {})
-            else:
-                logger.warning(f"[meta] Failed to fetch metadata for {token_address}: {resp.status}")
-                return {}
+    async with get_session().get(url, headers=HEADERS) as resp:
+        if resp.status == 200:
+            data = await resp.json()
+            return data.get("data", {})
+        else:
+            logger.warning(f"[meta] Failed to fetch metadata for {token_address}: {resp.status}")
+            return {}
 
 
 async def buy_token(mint, amount_sol):
@@ -90,11 +114,33 @@ async def sell_token(mint):
 
 async def get_token_price(mint):
     url = f"https://price.jup.ag/v4/price?ids={mint}"
-    async with aiohttp.ClientSession() as session:
-        data = await get_json(session, url)
-        if not data or "data" not in data or mint not in data["data"]:
-            return 0
-        return data["data"][mint]["price"]
+    data = await get_json(get_session(), url)
+    if not data or "data" not in data or mint not in data["data"]:
+        return 0
+    return data["data"][mint]["price"]
+
+
+async def get_latest_blockhash():
+    """Return a recent blockhash, refreshed at most every BLOCKHASH_TTL seconds."""
+    if _blockhash["blockhash"] and time.time() - _blockhash["fetched"] < BLOCKHASH_TTL:
+        return _blockhash["blockhash"]
+    payload = {
+        "jsonrpc": "2.0",
+        "id": 1,
+        "method": "getLatestBlockhash",
+        "params": [{"commitment": "confirmed"}]
+    }
+    try:
+        async with get_session().post(RPC_URL, json=payload) as resp:
+            if resp.status == 200:
+                data = await resp.json()
+                _blockhash["blockhash"] = data["result"]["value"]["blockhash"]
+                _blockhash["fetched"] = time.time()
+            else:
+                logger.warning(f"[blockhash] HTTP {resp.status}")
+    except Exception as e:
+        logger.warning(f"[blockhash] Error: {e}")
+    return _blockhash["blockhash"]
 
 
 async def send_telegram_message(msg):
@@ -107,10 +153,9 @@ async def send_telegram_message(msg):
         "text": msg
     }
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, json=payload) as resp:
-                if resp.status != 200:
-                    logger.warning(f"[telegram] Failed: {resp.status} {await resp.text()}")
+        async with get_session().post(url, json=payload) as resp:
+            if resp.status != 200:
+                logger.warning(f"[telegram] Failed: {resp.status} {await resp.text()}")
     except Exception as e:
         logger.warning(f"[telegram] Error: {e}")
 
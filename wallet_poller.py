@@ -0,0 +1,208 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger("wallet_poller")
+
+WALLET_URL = "https://api.pump.fun/wallet/{wallet}"
+
+BASE_INTERVAL = 15.0         # seconds between polls for a wallet with neutral weight
+MIN_INTERVAL = 2.0
+MAX_INTERVAL = 60.0
+RATE_LIMIT_BACKOFF = 60.0    # extra delay for a wallet after HTTP 429
+ACTIVITY_HALF_LIFE = 3600.0  # seconds for a wallet's buy activity score to halve
+DORMANT_AFTER = 3600.0       # seconds without a new buy before a wallet is polled less often
+DORMANT_FACTOR = 0.5
+PROFIT_ALPHA = 0.3           # EWMA weight of each closed trade's result
+MAX_CONCURRENCY = 8
+REQUESTS_PER_SECOND = 5.0
+
+
+class WalletScheduler:
+    """
+    Polls watched wallets concurrently under a global request budget.
+
+    Each wallet gets its own poll interval, BASE_INTERVAL for a wallet with no
+    history. Recent buy activity and good results on trades copied from it
+    shorten the interval. Going DORMANT_AFTER seconds without a buy, or losing
+    money on copied trades (closed, or marked to market while open), lengthens
+    it. If the wallets together would need more than `requests_per_second`,
+    every interval is stretched by the same factor so the total fits the
+    budget. Polls are conditional (ETag / Last-Modified), so an unchanged
+    wallet costs a 304. Each budget slot goes to the highest-weight wallet due
+    at that moment, the most overdue one on ties.
+
+    `on_update(wallet, data)` is awaited with the parsed response of every
+    changed wallet and must return the number of new buys it found.
+    """
+
+    def __init__(
+        self,
+        wallets: Iterable[str],
+        on_update: Callable[[str, dict], Awaitable[int]],
+        on_error: Optional[Callable[[str, Exception], Awaitable[None]]] = None,
+        max_concurrency: int = MAX_CONCURRENCY,
+        requests_per_second: float = REQUESTS_PER_SECOND
+    ):
+        self.on_update = on_update
+        self.on_error = on_error
+        self.max_concurrency = max_concurrency
+        self.requests_per_second = requests_per_second
+        self.wallets: Dict[str, dict] = {}
+        self._next_slot = 0.0
+        self._poll_done = asyncio.Event()
+        for wallet in wallets:
+            self.add_wallet(wallet)
+
+    def add_wallet(self, wallet: str):
+        if wallet in self.wallets:
+            return
+        self.wallets[wallet] = {
+            "next_due": time.monotonic(),
+            "in_flight": False,
+            "activity": 0.0,
+            "activity_at": time.monotonic(),
+            "last_buy_at": time.monotonic(),
+            "profit": 0.0,
+            "unrealized": None,
+            "etag": None,
+            "last_modified": None,
+            "polls": 0,
+            "not_modified": 0,
+        }
+
+    def remove_wallet(self, wallet: str):
+        self.wallets.pop(wallet, None)
+
+    def record_buys(self, wallet: str, count: int):
+        state = self.wallets.get(wallet)
+        if state is None:
+            return
+        now = time.monotonic()
+        decay = 0.5 ** ((now - state["activity_at"]) / ACTIVITY_HALF_LIFE)
+        state["activity"] = state["activity"] * decay + count
+        state["activity_at"] = now
+        state["last_buy_at"] = now
+
+    def record_result(self, wallet: str, multiple: float):
+        """Feed back the exit/entry price multiple of a trade copied from `wallet`."""
+        state = self.wallets.get(wallet)
+        if state is None or multiple <= 0:
+            return
+        state["profit"] += PROFIT_ALPHA * ((multiple - 1) - state["profit"])
+
+    def mark_to_market(self, wallet: str, multiples):
+        """Set the current/entry price multiples of the positions still open from `wallet`."""
+        state = self.wallets.get(wallet)
+        if state is None:
+            return
+        multiples = [m for m in multiples if m > 0]
+        state["unrealized"] = sum(m - 1 for m in multiples) / len(multiples) if multiples else None
+
+    def weight(self, wallet: str) -> float:
+        state = self.wallets[wallet]
+        now = time.monotonic()
+        decay = 0.5 ** ((now - state["activity_at"]) / ACTIVITY_HALF_LIFE)
+        profit = state["profit"]
+        if state["unrealized"] is not None:
+            profit = (profit + state["unrealized"]) / 2
+        profit_factor = min(max(1 + profit, 0.25), 4.0)
+        dormant_factor = DORMANT_FACTOR if now - state["last_buy_at"] > DORMANT_AFTER else 1.0
+        return (1 + state["activity"] * decay) * profit_factor * dormant_factor
+
+    def _base_interval(self, wallet: str) -> float:
+        return min(max(BASE_INTERVAL / self.weight(wallet), MIN_INTERVAL), MAX_INTERVAL)
+
+    def _stretch(self) -> float:
+        demand = sum(1 / self._base_interval(wallet) for wallet in self.wallets)
+        return max(1.0, demand / self.requests_per_second)
+
+    def interval(self, wallet: str) -> float:
+        return self._base_interval(wallet) * self._stretch()
+
+    def _next_due_wallet(self) -> Optional[str]:
+        now = time.monotonic()
+        best, best_key = None, None
+        for wallet, state in self.wallets.items():
+            if state["in_flight"] or state["next_due"] > now:
+                continue
+            key = (self.weight(wallet), now - state["next_due"])
+            if best_key is None or key > best_key:
+                best, best_key = wallet, key
+        return best
+
+    async def _take_budget(self):
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + 1 / self.requests_per_second
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def _poll(self, session, sem, wallet: str):
+        state = self.wallets[wallet]
+        new_buys = 0
+        delay = 0.0
+        data = None
+        validators = None
+        headers = {}
+        if state["etag"]:
+            headers["If-None-Match"] = state["etag"]
+        if state["last_modified"]:
+            headers["If-Modified-Since"] = state["last_modified"]
+        try:
+            async with sem:
+                async with session.get(WALLET_URL.format(wallet=wallet), headers=headers, timeout=10) as resp:
+                    state["polls"] += 1
+                    if resp.status == 304:
+                        state["not_modified"] += 1
+                    elif resp.status == 200:
+                        validators = (resp.headers.get("ETag"), resp.headers.get("Last-Modified"))
+                        data = await resp.json()
+                    elif resp.status == 404:
+                        logger.info(f"Wallet {wallet} not tracked (404).")
+                    elif resp.status == 429:
+                        logger.warning(f"Pump.fun rate limited wallet {wallet}, backing off")
+                        delay = RATE_LIMIT_BACKOFF
+                    else:
+                        logger.warning(f"Pump.fun API error for wallet {wallet}: HTTP {resp.status}")
+            # Handle outside the semaphore so slow buys don't hold up other polls
+            if data is not None:
+                new_buys = await self.on_update(wallet, data)
+                # Only now is this version handled, if on_update raised the next poll must see it again
+                state["etag"], state["last_modified"] = validators
+        except Exception as e:
+            logger.error(f"Wallet fetch error [{wallet}]: {e}")
+            if self.on_error is not None:
+                await self.on_error(wallet, e)
+        finally:
+            if new_buys:
+                self.record_buys(wallet, new_buys)
+            state["next_due"] = time.monotonic() + self.interval(wallet) + delay
+            state["in_flight"] = False
+            self._poll_done.set()
+
+    async def run(self, session):
+        sem = asyncio.Semaphore(self.max_concurrency)
+        tasks = set()
+        while True:
+            if self._next_due_wallet() is not None:
+                await self._take_budget()
+                # Pick after getting the slot, a higher-weight wallet may have come due while we waited
+                wallet = self._next_due_wallet()
+                if wallet is not None:
+                    self.wallets[wallet]["in_flight"] = True
+                    task = asyncio.create_task(self._poll(session, sem, wallet))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                continue
+
+            # Sleep until the next wallet is due, or a poll finishes and reschedules its wallet
+            now = time.monotonic()
+            upcoming = [s["next_due"] for s in self.wallets.values() if not s["in_flight"]]
+            wait = min(upcoming, default=now + 1) - now
+            self._poll_done.clear()
+            try:
+                await asyncio.wait_for(self._poll_done.wait(), min(max(wait, 0.01), 1.0))
+            except asyncio.TimeoutError:
+                pass